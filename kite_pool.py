@@ -0,0 +1,194 @@
+from kiteconnect import KiteConnect
+from kiteconnect.exceptions import TokenException
+from collections import deque
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Kite Connect per-app rate limits (requests per second)
+RATE_BUDGETS = {
+    "quote": 3,
+    "historical": 3,
+    "instruments": 1,
+}
+TOKEN_RELOAD_INTERVAL = 30  # Re-check the access token file every 30 seconds
+RENEW_COOLDOWN = TOKEN_RELOAD_INTERVAL  # Wait 30 seconds before retrying a failed token renewal
+
+
+# Sliding-window rate budget for one credential and one endpoint type
+class RateBudget:
+    def __init__(self, calls, period=1.0):
+        self.calls = calls
+        self.period = period
+        self.timestamps = deque()
+        self.lock = threading.Lock()
+
+    # Reserve a call slot; returns 0 on success, otherwise seconds until a slot frees up
+    def try_acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            while self.timestamps and now - self.timestamps[0] >= self.period:
+                self.timestamps.popleft()
+            if len(self.timestamps) < self.calls:
+                self.timestamps.append(now)
+                return 0
+            return self.period - (now - self.timestamps[0])
+
+
+# A single Kite Connect app/session with its own rate budgets
+class KiteCredential:
+    def __init__(self, api_key, api_secret=None, access_token=None, refresh_token=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.refresh_token = refresh_token
+        self.access_token = None
+        self.expired = True
+        self.last_renew_failure = None
+        self.client = KiteConnect(api_key=api_key)
+        self.budgets = {kind: RateBudget(calls) for kind, calls in RATE_BUDGETS.items()}
+        if access_token:
+            self.set_access_token(access_token)
+
+    def set_access_token(self, access_token):
+        self.client.set_access_token(access_token)
+        self.access_token = access_token
+        self.expired = False
+
+    # Renew the access token using the refresh token (only available to apps that are issued one)
+    def renew(self):
+        if not self.refresh_token or not self.api_secret:
+            return False
+        if self.last_renew_failure is not None and time.monotonic() - self.last_renew_failure < RENEW_COOLDOWN:
+            return False
+        try:
+            session = self.client.renew_access_token(self.refresh_token, self.api_secret)
+            self.set_access_token(session["access_token"])
+            self.refresh_token = session.get("refresh_token") or self.refresh_token
+            self.last_renew_failure = None
+            logger.info("Renewed access token for API_KEY: %s", self.api_key)
+            return True
+        except Exception as e:
+            logger.error("Error renewing access token for API_KEY %s: %s", self.api_key, e)
+            self.last_renew_failure = time.monotonic()
+            return False
+
+
+# Pool of Kite Connect credentials that spreads calls across per-credential rate budgets
+class KiteClientPool:
+    def __init__(self, credentials, token_file=None):
+        if not credentials:
+            raise ValueError("KiteClientPool needs at least one credential")
+        self.credentials = credentials
+        self.token_file = token_file
+        self.token_file_mtime = None
+        self.last_token_check = 0
+        self.next_index = 0
+        self.lock = threading.Lock()
+        self.reload_tokens(force=True)
+
+    def __len__(self):
+        return len(self.credentials)
+
+    # Pick up access tokens written to the token file (e.g. by a daily login job) without a restart.
+    # The file holds a JSON object mapping api_key to either an access token string or
+    # {"access_token": ..., "refresh_token": ...}.
+    # force skips the check interval; a file that has not changed since the last read is never re-applied.
+    def reload_tokens(self, force=False):
+        if not self.token_file:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_token_check < TOKEN_RELOAD_INTERVAL:
+            return
+        self.last_token_check = now
+
+        try:
+            mtime = os.path.getmtime(self.token_file)
+            if mtime == self.token_file_mtime:
+                return
+            with open(self.token_file) as f:
+                tokens = json.load(f)
+            self.token_file_mtime = mtime
+        except Exception as e:
+            logger.error("Error reading access token file %s: %s", self.token_file, e)
+            return
+
+        for credential in self.credentials:
+            entry = tokens.get(credential.api_key)
+            if isinstance(entry, dict):
+                access_token = entry.get("access_token")
+                credential.refresh_token = entry.get("refresh_token") or credential.refresh_token
+            else:
+                access_token = entry
+            if access_token and (access_token != credential.access_token or credential.expired):
+                credential.set_access_token(access_token)
+                logger.info("Loaded access token from file for API_KEY: %s", credential.api_key)
+
+    # Wait for a credential with a valid token and spare budget for this kind of call
+    def acquire(self, kind):
+        while True:
+            self.reload_tokens()
+            with self.lock:
+                start = self.next_index
+                self.next_index = (self.next_index + 1) % len(self.credentials)
+
+            wait = None
+            for offset in range(len(self.credentials)):
+                credential = self.credentials[(start + offset) % len(self.credentials)]
+                if credential.expired:
+                    continue
+                delay = credential.budgets[kind].try_acquire()
+                if delay == 0:
+                    return credential
+                wait = delay if wait is None else min(wait, delay)
+
+            if wait is None:
+                # Every credential is expired: try to renew (subject to the per-credential cooldown)
+                # or pick up a newly written token file before giving up
+                renewed = [credential for credential in self.credentials if credential.renew()]
+                if not renewed:
+                    self.reload_tokens(force=True)
+                if not any(not credential.expired for credential in self.credentials):
+                    raise TokenException("No Kite Connect credential has a valid access token")
+                continue
+
+            time.sleep(wait)
+
+    # Run a KiteConnect method on the next available credential, rotating away from expired tokens
+    def call(self, kind, method, *args, **kwargs):
+        last_error = None
+        for _ in range(len(self.credentials) + 1):
+            credential = self.acquire(kind)
+            try:
+                return getattr(credential.client, method)(*args, **kwargs)
+            except TokenException as e:
+                logger.warning("Access token expired for API_KEY %s: %s", credential.api_key, e)
+                last_error = e
+                credential.expired = True
+                credential.renew()
+        raise last_error
+
+    def quote(self, symbols):
+        return self.call("quote", "quote", symbols)
+
+    def historical_data(self, *args, **kwargs):
+        return self.call("historical", "historical_data", *args, **kwargs)
+
+    def instruments(self, exchange=None):
+        return self.call("instruments", "instruments", exchange)
+
+
+# Parse KITE_CREDENTIALS-style config: comma-separated api_key:api_secret[:access_token[:refresh_token]]
+def parse_credentials(value):
+    credentials = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        parts = entry.split(":")
+        api_key, api_secret, access_token, refresh_token = (parts + [None] * 4)[:4]
+        credentials.append(KiteCredential(api_key, api_secret or None, access_token or None, refresh_token or None))
+    return credentials
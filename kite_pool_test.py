@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+from kiteconnect.exceptions import TokenException
+
+import kite_pool
+from kite_pool import KiteClientPool, KiteCredential, parse_credentials
+
+
+# Stand-in for KiteConnect: records calls and returns (or raises) a fixed result
+class StubClient:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.renew_calls = 0
+        self.access_token = None
+
+    def set_access_token(self, access_token):
+        self.access_token = access_token
+
+    def quote(self, symbols):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.result
+
+    def renew_access_token(self, refresh_token, api_secret):
+        self.renew_calls += 1
+        raise Exception("renew failed")
+
+
+def make_credential(api_key, client=None, refresh_token=None):
+    credential = KiteCredential(api_key, "secret", "token-" + api_key, refresh_token)
+    credential.client = client or StubClient(result={"api_key": api_key})
+    return credential
+
+
+def no_sleep(seconds):
+    raise AssertionError("pool tried to sleep %.3f s" % seconds)
+
+
+def test_budget_scales_with_credentials(monkeypatch):
+    monkeypatch.setattr(kite_pool.time, "sleep", no_sleep)
+    pool = KiteClientPool([make_credential("k1"), make_credential("k2")])
+
+    # 2 credentials x 3 quotes/s are served without waiting
+    served = [pool.quote(["NSE:SBIN"])["api_key"] for _ in range(6)]
+    assert sorted(served) == ["k1"] * 3 + ["k2"] * 3
+
+    # The next quote has to wait for a slot to free up
+    with pytest.raises(AssertionError, match="tried to sleep"):
+        pool.quote(["NSE:SBIN"])
+
+
+def test_token_exception_rotates_then_raises():
+    expired = make_credential("k1", StubClient(error=TokenException("expired")))
+    healthy = make_credential("k2")
+    pool = KiteClientPool([expired, healthy])
+
+    assert pool.quote(["NSE:SBIN"]) == {"api_key": "k2"}
+    assert expired.expired and not healthy.expired
+
+    healthy.client.error = TokenException("expired")
+    with pytest.raises(TokenException):
+        pool.quote(["NSE:SBIN"])
+    assert expired.expired and healthy.expired
+
+
+def test_failed_renew_waits_for_cooldown():
+    client = StubClient(error=TokenException("expired"))
+    credential = make_credential("k1", client, refresh_token="refresh")
+    pool = KiteClientPool([credential])
+
+    for _ in range(5):
+        with pytest.raises(TokenException):
+            pool.quote(["NSE:SBIN"])
+    assert client.renew_calls == 1
+
+
+def test_token_file_reload_clears_expired(tmp_path):
+    token_file = tmp_path / "tokens.json"
+    token_file.write_text(json.dumps({"k1": "old"}))
+    credential = make_credential("k1")
+    pool = KiteClientPool([credential], token_file=str(token_file))
+    assert credential.access_token == "old"
+
+    credential.expired = True
+    # An unchanged file does not resurrect the expired token
+    pool.reload_tokens(force=True)
+    assert credential.expired
+
+    token_file.write_text(json.dumps({"k1": {"access_token": "new", "refresh_token": "refresh"}}))
+    mtime = os.path.getmtime(token_file) + 1
+    os.utime(token_file, (mtime, mtime))
+    pool.reload_tokens(force=True)
+    assert not credential.expired
+    assert credential.access_token == "new"
+    assert credential.refresh_token == "refresh"
+
+
+def test_parse_credentials():
+    credentials = parse_credentials("k1:s1, ,k2:s2:t2:r2,k3,")
+
+    assert [credential.api_key for credential in credentials] == ["k1", "k2", "k3"]
+    assert credentials[0].api_secret == "s1"
+    assert credentials[0].access_token is None and credentials[0].expired
+    assert credentials[1].access_token == "t2" and not credentials[1].expired
+    assert credentials[1].refresh_token == "r2"
+    assert credentials[2].api_secret is None
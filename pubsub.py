@@ -0,0 +1,227 @@
+from threading import Thread, Lock
+import json
+import logging
+import os
+import queue
+import socket
+import time
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_EVERY = 30  # Send a full snapshot instead of a delta every 30 versions
+SEND_TIMEOUT = 5  # Drop subscribers that cannot take a message within 5 seconds
+SEND_QUEUE_SIZE = 10  # Drop subscribers that fall more than 10 messages behind
+RECONNECT_DELAY = 2  # Seconds between subscriber reconnect attempts
+
+
+# Parse an address: "host:port" is TCP, anything else is a Unix socket path
+def _parse_address(address):
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def _encode(message):
+    # default=str covers datetimes returned by Kite Connect (e.g. last_time)
+    return (json.dumps(message, default=str) + "\n").encode("utf-8")
+
+
+# Diff two states one level down. Top-level values that are dicts with the same keys, or lists
+# of the same length, are sent as a patch of the changed entries; anything else is replaced.
+def _diff(old, new):
+    changes = {}
+    patches = {}
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict) and value.keys() == previous.keys():
+            patches[key] = {subkey: item for subkey, item in value.items() if previous[subkey] != item}
+        elif isinstance(value, list) and isinstance(previous, list) and len(value) == len(previous):
+            patches[key] = {str(index): item for index, item in enumerate(value) if previous[index] != item}
+        else:
+            changes[key] = value
+    removed = [key for key in old if key not in new]
+    return changes, patches, removed
+
+
+# Refuse to take over a Unix socket that another publisher is still serving
+def _claim_unix_socket(path):
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)  # Stale socket left behind by a publisher that exited
+        return
+    finally:
+        probe.close()
+    raise RuntimeError("Another publisher is already listening on %s" % path)
+
+
+# A connected subscriber with its own bounded send queue and sender thread
+class _Connection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.settimeout(SEND_TIMEOUT)
+        self.queue = queue.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.closed = False
+        Thread(target=self._send_loop, daemon=True).start()
+
+    # Queue a payload without blocking; returns False if the subscriber is gone or too far behind
+    def offer(self, payload):
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            logger.warning("Subscriber is %d messages behind", SEND_QUEUE_SIZE)
+            self.close()
+            return False
+
+    def close(self):
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)  # Wake the sender thread
+        except queue.Full:
+            pass
+        self.conn.close()
+
+    def _send_loop(self):
+        while not self.closed:
+            payload = self.queue.get()
+            if payload is None:
+                break
+            try:
+                self.conn.sendall(payload)
+            except OSError as e:
+                logger.warning("Error sending to subscriber: %s", e)
+                self.close()
+
+
+# Publishes versioned snapshots and deltas of a flat state dict to every connected subscriber
+class Publisher:
+    def __init__(self, address):
+        self.address = address
+        self.lock = Lock()
+        self.subscribers = []
+        self.version = 0
+        self.state = {}
+
+        family, bind_address = _parse_address(address)
+        if family == socket.AF_UNIX:
+            _claim_unix_socket(bind_address)
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(bind_address)
+        self.server.listen()
+        logger.info("Publisher listening on %s", address)
+
+        Thread(target=self._accept_loop, daemon=True).start()
+
+    def _snapshot_message(self):
+        return {"type": "snapshot", "version": self.version, "state": self.state}
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError as e:
+                logger.error("Publisher stopped accepting subscribers: %s", e)
+                return
+            connection = _Connection(conn)
+            # Queue the snapshot under the lock so the new subscriber cannot miss a delta
+            with self.lock:
+                if self.version:
+                    connection.offer(_encode(self._snapshot_message()))
+                self.subscribers.append(connection)
+                logger.info("Subscriber connected (%d total)", len(self.subscribers))
+
+    # Publish a new version of the state; only what changed since the last version is sent as a delta
+    def publish(self, state):
+        with self.lock:
+            changes, patches, removed = _diff(self.state, state)
+            self.version += 1
+            self.state = dict(state)
+
+            if self.version == 1 or self.version % SNAPSHOT_EVERY == 0:
+                message = self._snapshot_message()
+            else:
+                message = {"type": "delta", "version": self.version, "changes": changes, "patches": patches, "removed": removed}
+            payload = _encode(message)
+
+            # Sending happens on each subscriber's own thread, so a stalled subscriber cannot hold up the rest
+            self.subscribers = [connection for connection in self.subscribers if connection.offer(payload)]
+
+            logger.info("Published %s version %d (%d bytes) to %d subscriber(s)", message["type"], self.version, len(payload), len(self.subscribers))
+            return self.version
+
+
+# Keeps an in-memory copy of the publisher's state, reconnecting and resyncing as needed
+class Subscriber:
+    def __init__(self, address, read_timeout=None):
+        self.address = address
+        self.read_timeout = read_timeout  # Reconnect if nothing arrives for this many seconds
+        self.lock = Lock()
+        self.version = 0
+        self.state = {}
+        self.received_at = None
+
+    def start(self):
+        Thread(target=self._run, daemon=True).start()
+        return self
+
+    # Return (version, state, age) for the latest state received; age is seconds since the
+    # last message from the publisher, or None if nothing has been received yet
+    def snapshot(self):
+        with self.lock:
+            age = time.monotonic() - self.received_at if self.received_at is not None else None
+            return self.version, self.state, age
+
+    def _run(self):
+        family, connect_address = _parse_address(self.address)
+        while True:
+            try:
+                with socket.socket(family, socket.SOCK_STREAM) as sock:
+                    sock.connect(connect_address)
+                    sock.settimeout(self.read_timeout)
+                    logger.info("Subscribed to %s", self.address)
+                    with sock.makefile("r", encoding="utf-8") as stream:
+                        for line in stream:
+                            if not self._apply(json.loads(line)):
+                                break  # Reconnect to get a fresh snapshot
+            except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+                # Socket errors, read timeouts and malformed messages all resync via a new snapshot
+                logger.warning("Subscription to %s lost: %s", self.address, e)
+            time.sleep(RECONNECT_DELAY)
+
+    def _apply(self, message):
+        with self.lock:
+            if message["type"] == "snapshot":
+                self.state = message["state"]
+            elif message["version"] == self.version + 1:
+                # Build new containers so readers holding the previous state are unaffected
+                state = dict(self.state)
+                state.update(message["changes"])
+                for key, patch in message["patches"].items():
+                    if isinstance(state[key], list):
+                        value = list(state[key])
+                        for index, item in patch.items():
+                            value[int(index)] = item
+                    else:
+                        value = dict(state[key])
+                        value.update(patch)
+                    state[key] = value
+                for key in message["removed"]:
+                    state.pop(key, None)
+                self.state = state
+            else:
+                logger.warning("Missed update (have version %d, got %d); resyncing", self.version, message["version"])
+                return False
+            self.version = message["version"]
+            self.received_at = time.monotonic()
+            return True
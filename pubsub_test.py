@@ -0,0 +1,124 @@
+import datetime
+import socket
+import time
+
+import pytest
+
+import pubsub
+from pubsub import Publisher, Subscriber
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError("condition not met within %s seconds" % timeout)
+
+
+@pytest.fixture
+def address(tmp_path):
+    return str(tmp_path / "pubsub.sock")
+
+
+@pytest.fixture(autouse=True)
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(pubsub, "RECONNECT_DELAY", 0.05)
+
+
+def test_snapshot_on_connect(address):
+    publisher = Publisher(address)
+    publisher.publish({"app_active": True, "nifty": {"last_price": 100}})
+    publisher.publish({"app_active": True, "nifty": {"last_price": 101}})
+
+    subscriber = Subscriber(address).start()
+    wait_for(lambda: subscriber.snapshot()[0] == 2)
+    version, state, age = subscriber.snapshot()
+    assert state == {"app_active": True, "nifty": {"last_price": 101}}
+    assert 0 <= age < 5
+
+
+def test_delta_applied(address):
+    publisher = Publisher(address)
+    subscriber = Subscriber(address).start()
+    wait_for(lambda: publisher.subscribers)
+
+    chain = [{"strike": 100, "call_ltp": 1}, {"strike": 200, "call_ltp": 2}]
+    publisher.publish({"last_updated": "a", "nifty": {"last_price": 100, "vwap": 99}, "nifty_chain": chain, "error": "x"})
+    wait_for(lambda: subscriber.snapshot()[0] == 1)
+    first_state = subscriber.snapshot()[1]
+
+    chain = [{"strike": 100, "call_ltp": 1}, {"strike": 200, "call_ltp": 3}]
+    new_state = {"last_updated": "b", "nifty": {"last_price": 101, "vwap": 99}, "nifty_chain": chain}
+    publisher.publish(new_state)
+    wait_for(lambda: subscriber.snapshot()[0] == 2)
+
+    assert subscriber.snapshot()[1] == new_state
+    assert first_state["nifty"]["last_price"] == 100  # Earlier readers keep their copy
+
+
+def test_delta_sends_only_changed_entries():
+    old = {"last_updated": "a", "nifty": {"last_price": 100, "vwap": 99}, "chain": [1, 2, 3], "gone": 1}
+    new = {"last_updated": "b", "nifty": {"last_price": 101, "vwap": 99}, "chain": [1, 5, 3]}
+    changes, patches, removed = pubsub._diff(old, new)
+    assert changes == {"last_updated": "b"}
+    assert patches == {"nifty": {"last_price": 101}, "chain": {"1": 5}}
+    assert removed == ["gone"]
+
+
+def test_resync_after_version_gap(address):
+    publisher = Publisher(address)
+    subscriber = Subscriber(address).start()
+    wait_for(lambda: publisher.subscribers)
+    publisher.publish({"a": 1})
+    wait_for(lambda: subscriber.snapshot()[0] == 1)
+
+    # Skip a version: the subscriber must drop the delta and reconnect for a snapshot
+    publisher.version += 1
+    publisher.publish({"a": 2})
+    wait_for(lambda: subscriber.snapshot()[0] == 3)
+    assert subscriber.snapshot()[1] == {"a": 2}
+
+
+def test_datetimes_serialised(address):
+    publisher = Publisher(address)
+    publisher.publish({"nifty": {"timestamp": datetime.datetime(2025, 4, 1, 9, 15)}})
+
+    subscriber = Subscriber(address).start()
+    wait_for(lambda: subscriber.snapshot()[0] == 1)
+    assert subscriber.snapshot()[1] == {"nifty": {"timestamp": "2025-04-01 09:15:00"}}
+
+
+def test_stalled_subscriber_does_not_block_publish(address, monkeypatch):
+    monkeypatch.setattr(pubsub, "SEND_QUEUE_SIZE", 2)
+    publisher = Publisher(address)
+    stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stalled.connect(address)  # Never reads
+    wait_for(lambda: publisher.subscribers)
+
+    big_state = {"chain": ["x" * 100000]}
+    started = time.monotonic()
+    for i in range(20):
+        publisher.publish({"chain": big_state["chain"] + [i]})
+    assert time.monotonic() - started < 1
+    assert publisher.subscribers == []
+    stalled.close()
+
+
+def test_refuses_to_take_over_live_socket(address):
+    Publisher(address)
+    with pytest.raises(RuntimeError):
+        Publisher(address)
+
+
+def test_replaces_stale_socket(address):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(address)
+    stale.close()
+
+    publisher = Publisher(address)
+    subscriber = Subscriber(address).start()
+    wait_for(lambda: publisher.subscribers)
+    publisher.publish({"a": 1})
+    wait_for(lambda: subscriber.snapshot()[0] == 1)